@@ -39,6 +39,7 @@ public extension Generation {
         // Iterate until we find the eos token or reach the max length
         // TODO: additional stopping criteria
         var outputTokens = tokens
+        outputTokens.reserveCapacity(config.maxLength)
         while outputTokens.count < config.maxLength {
             let logits = model(outputTokens, config)
             let (nextToken, _) = Math.argmax(logits)
@@ -54,11 +55,12 @@ public extension Generation {
         // Iterate until we find the eos token or reach the max length
         // TODO: additional stopping criteria
         var outputTokens = tokens
+        outputTokens.reserveCapacity(config.maxLength)
         let logitsProcessor = LogitsProcessor(logitsWarpers: logitsWarpers(config: config))
         while outputTokens.count < config.maxLength {
             let outputs = model(outputTokens, config)
             /// `floats` can be much faster than `scalars` for a vector with stride 1, as it uses `memcpy` in that case
-            let logits = (outputs as? MLShapedArraySlice<Float>)?.floats ?? outputs.scalars as! [Float]
+            let logits = (outputs as? MLShapedArraySlice<Float>)?.floats ?? (outputs as? MLShapedArray<Float>)?.floats ?? outputs.scalars as! [Float]
             let (indexes, processedLogits) = logitsProcessor(logits)
             let nextToken = Math.sample(indexes: indexes, probs: Math.softmax(processedLogits))
             if nextToken == config.eosTokenId { break }
@@ -5,6 +5,7 @@
 //  Created by Pedro Cuenca on 7/5/23.
 //
 
+import Accelerate
 import CoreML
 import Tokenizers
 import Generation
@@ -27,13 +28,22 @@ public class LanguageModel {
     
     private var configuration: LanguageModelConfigurationFromHub? = nil
     private var _tokenizer: Tokenizer? = nil
+    
+    /// Read once from the model description, as they are needed at every prediction step
+    private let _inputIdsName: String
+    private let _inputIdsShape: [Int]
+    private let _inputIdsShapeConstraintType: MLMultiArrayShapeConstraintType
+    private let _requiresAttention: Bool
+    
+    /// Input shapes supported by models exported with enumerated shapes, sorted by sequence length. Empty otherwise.
+    private let enumeratedInputShapes: [[Int]]
 
     public required init(model: MLModel) {
         self.model = model
         
         // We assume inputs named "input_ids" with shape (1, seq_length)
         // Perhaps we should convert to vectors of shape (seq_length) and use sequenceConstraint instead of shapeConstraint
-        let inputDescription = model.modelDescription.inputDescriptionsByName["input_ids"]
+        let inputDescription = model.modelDescription.inputDescriptionsByName[input_ids]
         
         guard let shapeConstraint = inputDescription?.multiArrayConstraint?.shapeConstraint else {
             fatalError("Cannot obtain shape information")
@@ -41,20 +51,29 @@ public class LanguageModel {
         
         switch shapeConstraint.type {
         case .enumerated:
-            // TODO: support a set of fixed shapes (keeping the first one here)
-            minContextLength = shapeConstraint.enumeratedShapes[0][1].intValue
-            maxContextLength = minContextLength
+            let shapes = LanguageModel.sortedInputShapes(shapeConstraint.enumeratedShapes)
+            minContextLength = shapes.first![1]
+            maxContextLength = shapes.last![1]
+            enumeratedInputShapes = shapes
         case .range:
             let range = inputDescription?.multiArrayConstraint?.shapeConstraint.sizeRangeForDimension[1] as? NSRange
             minContextLength = range?.location ?? 1
             maxContextLength = range?.length ?? 128
+            enumeratedInputShapes = []
         case .unspecified:
             minContextLength = 128
             maxContextLength = 128
+            enumeratedInputShapes = []
         @unknown default:
             minContextLength = 128
             maxContextLength = 128
+            enumeratedInputShapes = []
         }
+        
+        _inputIdsName = inputDescription!.name
+        _inputIdsShape = inputDescription!.multiArrayConstraint!.shape.map { $0.intValue }
+        _inputIdsShapeConstraintType = shapeConstraint.type
+        _requiresAttention = model.modelDescription.inputDescriptionsByName[attention_mask] != nil
                 
         self.configuration = LanguageModelConfigurationFromHub(modelName: modelName)
     }
@@ -94,16 +113,16 @@ public extension LanguageModel {
     }
     
     var inputIdsName: String {
-        inputIdsDescription.name
+        _inputIdsName
     }
     
     /// The expected shape of the models latent sample input
     var inputIdsShape: [Int] {
-        inputIdsDescription.multiArrayConstraint!.shape.map { $0.intValue }
+        _inputIdsShape
     }
     
     var requiresAttention: Bool {
-        model.modelDescription.inputDescriptionsByName[attention_mask] != nil
+        _requiresAttention
     }
     
     // MLShapedArrayProtocol is either a MLShapedArray or a MLShapedArraySlice
@@ -112,14 +131,27 @@ public extension LanguageModel {
         
         // Maybe pad or truncate
         let maxTokens = min(tokens.count, maxContextLength)
-        let padLength = maxTokens >= minContextLength ? 0 : minContextLength-maxTokens
-        let inputTokens = Array(tokens[0..<maxTokens]) + Array(repeating: config.padTokenId ?? 0, count: padLength)
+        let shape = LanguageModel.inputShape(
+            for: maxTokens,
+            constraintType: _inputIdsShapeConstraintType,
+            enumeratedShapes: enumeratedInputShapes,
+            defaultShape: inputIdsShape,
+            minContextLength: minContextLength
+        )
+        precondition(maxTokens <= shape.reduce(1, *), "Input shape \(shape) is too small for \(maxTokens) tokens")
+        let padTokenId = Int32(config.padTokenId ?? 0)
         
-        let inputIds = MLShapedArray<Int32>(scalars: inputTokens.map { Int32($0) }, shape: inputIdsShape)
+        // Write scalars in place instead of concatenating and converting intermediate arrays on every step
+        let inputIds = MLShapedArray<Int32>(unsafeUninitializedShape: shape) { scalars, _ in
+            for i in 0..<maxTokens { scalars[i] = Int32(tokens[i]) }
+            for i in maxTokens..<scalars.count { scalars[i] = padTokenId }
+        }
         var inputDictionary = [inputIdsName: MLFeatureValue(shapedArray: inputIds)]
         if requiresAttention {
-            let mask = Array(repeating: 1, count: maxTokens) + Array(repeating: 0, count: padLength)
-            let attentionMask = MLShapedArray<Int32>(scalars: mask.map{ Int32($0) }, shape: inputIdsShape)
+            let attentionMask = MLShapedArray<Int32>(unsafeUninitializedShape: shape) { scalars, _ in
+                for i in 0..<maxTokens { scalars[i] = 1 }
+                for i in maxTokens..<scalars.count { scalars[i] = 0 }
+            }
             inputDictionary[attention_mask] = MLFeatureValue(shapedArray: attentionMask)
         }
         let input = try! MLDictionaryFeatureProvider(dictionary: inputDictionary)
@@ -129,9 +161,76 @@ public extension LanguageModel {
         // TODO: maybe try to support models with "token_scores" too (after the softmax)
         assert(output.featureNames.first! == "logits")
 
-        let scores = output.featureValue(for: output.featureNames.first!)!.shapedArrayValue(of: Float.self)!
-        let nextTokenScores = scores[0, maxTokens - 1]
-        return nextTokenScores
+        let scores = output.featureValue(for: output.featureNames.first!)!
+        return LanguageModel.tokenScores(scores, at: maxTokens - 1)
+    }
+}
+
+/// Logits extraction
+extension LanguageModel {
+    /// Extracts the scores for a single position in the sequence.
+    /// Only that row is copied, instead of converting the logits for the whole sequence and slicing them afterwards.
+    /// Float16 outputs are kept as such in the model and only the selected row is converted to Float.
+    static func tokenScores(_ scores: MLFeatureValue, at position: Int) -> any MLShapedArrayProtocol {
+        guard let logits = scores.multiArrayValue, logits.shape.count == 3 else {
+            return scores.shapedArrayValue(of: Float.self)![0, position]
+        }
+        
+        let vocabSize = logits.shape[2].intValue
+        let strides = logits.strides.map { $0.intValue }
+        let offset = position * strides[1]
+        switch logits.dataType {
+        case .float32:
+            return logits.withUnsafeBufferPointer(ofType: Float.self) { ptr in
+                MLShapedArray<Float>(unsafeUninitializedShape: [vocabSize]) { row, _ in
+                    for i in 0..<vocabSize { row[i] = ptr[offset + i * strides[2]] }
+                }
+            }
+        case .float16 where strides[2] == 1:
+            return logits.withUnsafeBytes { ptr in
+                MLShapedArray<Float>(unsafeUninitializedShape: [vocabSize]) { row, _ in
+                    var source = vImage_Buffer(
+                        data: UnsafeMutableRawPointer(mutating: ptr.baseAddress! + offset * MemoryLayout<UInt16>.stride),
+                        height: 1,
+                        width: vImagePixelCount(vocabSize),
+                        rowBytes: vocabSize * MemoryLayout<UInt16>.stride
+                    )
+                    var destination = vImage_Buffer(
+                        data: row.baseAddress!,
+                        height: 1,
+                        width: vImagePixelCount(vocabSize),
+                        rowBytes: vocabSize * MemoryLayout<Float>.stride
+                    )
+                    vImageConvert_Planar16FtoPlanarF(&source, &destination, vImage_Flags(kvImageNoFlags))
+                }
+            }
+        default:
+            return scores.shapedArrayValue(of: Float.self)![0, position]
+        }
+    }
+}
+
+/// Input shape selection
+extension LanguageModel {
+    /// Enumerated input shapes, sorted by sequence length (the second dimension)
+    static func sortedInputShapes(_ shapes: [[NSNumber]]) -> [[Int]] {
+        shapes.map { shape in shape.map { $0.intValue } }.sorted { $0[1] < $1[1] }
+    }
+    
+    /// Models with enumerated shapes are run with the smallest sequence length that fits the tokens,
+    /// so short inputs don't pay for the largest shape the model supports.
+    /// Models with a flexible range take the sequence length itself, padded up to their minimum.
+    /// Any other model uses its default shape.
+    static func inputShape(for tokenCount: Int, constraintType: MLMultiArrayShapeConstraintType, enumeratedShapes: [[Int]], defaultShape: [Int], minContextLength: Int) -> [Int] {
+        switch constraintType {
+        case .enumerated:
+            // Callers cap `tokenCount` at the largest enumerated length, so there is always a match
+            return enumeratedShapes.first { $0[1] >= tokenCount }!
+        case .range:
+            return [1, max(tokenCount, minContextLength)]
+        default:
+            return defaultShape
+        }
     }
 }
 
@@ -15,9 +15,10 @@ public extension MLShapedArray<Float> {
             return self.scalars
         }
         
-        // Fast path: memcpy
-        let mlArray = MLMultiArray(self)
-        return mlArray.floats ?? self.scalars
+        // Fast path: copy straight from the contiguous storage, without an intermediate MLMultiArray
+        return self.withUnsafeShapedBufferPointer { ptr, _, _ in
+            Array(UnsafeBufferPointer(start: ptr.baseAddress, count: self.count))
+        }
     }
 }
 
@@ -29,9 +30,10 @@ public extension MLShapedArraySlice<Float> {
             return self.scalars
         }
 
-        // Fast path: memcpy
-        let mlArray = MLMultiArray(self)
-        return mlArray.floats ?? self.scalars
+        // Fast path: copy straight from the contiguous storage, without an intermediate MLMultiArray
+        return self.withUnsafeShapedBufferPointer { ptr, _, _ in
+            Array(UnsafeBufferPointer(start: ptr.baseAddress, count: self.count))
+        }
     }
 }
 
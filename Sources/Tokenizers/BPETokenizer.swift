@@ -84,16 +84,14 @@ class BPETokenizer: PreTrainedTokenizerModel {
     }
 
     func byteEncode(text: String) -> [String] {
-        let RE = #"'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"#
-        let tokens = text.ranges(of: RE).map { String(text[$0]) }
+        let tokens = text.ranges(of: ByteLevelPreTokenizer.RE).map { String(text[$0]) }
         return tokens.map { (token) -> String in
             return Array(token.utf8).map { byteEncoder[$0]! }.joined()
         }
     }
     
     func hexaEncode(text: String) -> [String] {
-        let RE = #"'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"#
-        let tokens = text.ranges(of: RE).map { String(text[$0]) }
+        let tokens = text.ranges(of: ByteLevelPreTokenizer.RE).map { String(text[$0]) }
         return tokens.flatMap { (token) -> [String] in
             return Array(token.utf8).map { String(format: "<0x%02X>", $0) }
         }
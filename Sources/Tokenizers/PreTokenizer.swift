@@ -84,10 +84,10 @@ class PreTokenizerSequence: PreTokenizer {
 }
 
 class WhitespacePreTokenizer: PreTokenizer {
-    let re: String
+    let re: NSRegularExpression
 
     required init(config: Config) {
-        re = #"\S+"#
+        re = try! NSRegularExpression(pattern: #"\S+"#, options: [])
     }
 
     func preTokenize(text: String, options: PreTokenizerOptions = [.firstSection]) -> [String] {
@@ -161,7 +161,8 @@ class ByteLevelPreTokenizer: PreTokenizer {
     let addPrefixSpace: Bool
     let trimOffsets: Bool
     let useRegex: Bool
-    let RE = #"'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"#
+    /// Byte-level split pattern, compiled once and shared with `BPETokenizer`
+    static let RE = try! NSRegularExpression(pattern: #"'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"#, options: [])
     
     required init(config: Config) {
         addPrefixSpace = config.addPrefixSpace?.boolValue ?? false
@@ -171,7 +172,7 @@ class ByteLevelPreTokenizer: PreTokenizer {
     
     func preTokenize(text: String, options: PreTokenizerOptions = [.firstSection]) -> [String] {
         // Split on whitespace and punctuation
-        let tokens = useRegex ? text.ranges(of: RE).map({ String(text[$0]) }) : [text]
+        let tokens = useRegex ? text.ranges(of: Self.RE).map({ String(text[$0]) }) : [text]
         return tokens.map { token in
             if addPrefixSpace && !token.hasPrefix(" ") {
                 return " " + token
@@ -185,10 +186,10 @@ class ByteLevelPreTokenizer: PreTokenizer {
 
 class PunctuationPreTokenizer: PreTokenizer {
     let PUNCTUATION_REGEX = #"\p{P}\u0021-\u002F\u003A-\u0040\u005B-\u0060\u007B-\u007E"#
-    let re: String
+    let re: NSRegularExpression
 
     required init(config: Config) {
-        re = "[^\(PUNCTUATION_REGEX)]+|[\(PUNCTUATION_REGEX)]+"
+        re = try! NSRegularExpression(pattern: "[^\(PUNCTUATION_REGEX)]+|[\(PUNCTUATION_REGEX)]+", options: [])
     }
 
     func preTokenize(text: String, options: PreTokenizerOptions = [.firstSection]) -> [String] {
@@ -198,11 +199,11 @@ class PunctuationPreTokenizer: PreTokenizer {
 }
 
 class DigitsPreTokenizer: PreTokenizer {
-    let re: String
+    let re: NSRegularExpression
 
     required init(config: Config) {
         let individualDigits = config.individualDigits?.boolValue ?? false
-        re = "[^\\d]+|\\d\(individualDigits ? "" : "+")"
+        re = try! NSRegularExpression(pattern: "[^\\d]+|\\d\(individualDigits ? "" : "+")", options: [])
     }
 
     func preTokenize(text: String, options: PreTokenizerOptions = [.firstSection]) -> [String] {
@@ -263,6 +264,12 @@ public extension String {
         }
         return result
     }
+    
+    /// Same as above, but using a regular expression that was compiled once instead of on every search
+    func ranges(of regex: NSRegularExpression) -> [Range<Index>] {
+        let selfRange = NSRange(startIndex..<endIndex, in: self)
+        return regex.matches(in: self, options: [], range: selfRange).compactMap { Range($0.range, in: self) }
+    }
         
     func split(by string: String, options: CompareOptions = .regularExpression, includeSeparators: Bool = false, omittingEmptySubsequences: Bool = true) -> [String] {
         var result: [String] = []
@@ -1,5 +1,6 @@
 import ArgumentParser
 import CoreML
+import CryptoKit
 import Foundation
 
 import Models
@@ -59,11 +60,64 @@ struct TransformersCLI: ParsableCommand {
         fatalError("Model compilation is not supported on watchOS")
         #else
         if url.pathExtension == "mlmodelc" { return url }
+        let cacheDirectory = compiledModelCacheDirectory(for: url)
+        let cachedURL = cacheDirectory.appending(component: url.deletingPathExtension().lastPathComponent).appendingPathExtension("mlmodelc")
+        let fingerprintURL = cacheDirectory.appending(component: "fingerprint")
+        let sourceFingerprint = fingerprint(of: url)
+        if FileManager.default.fileExists(atPath: cachedURL.path),
+           let cachedFingerprint = try? String(contentsOf: fingerprintURL, encoding: .utf8),
+           cachedFingerprint == sourceFingerprint {
+            print("Using cached compiled model \(cachedURL)")
+            return cachedURL
+        }
         print("Compiling model \(url)")
-        return try MLModel.compileModel(at: url)
+        let compiledURL = try MLModel.compileModel(at: url)
+
+        // Keep the compiled model so subsequent runs can skip compilation.
+        // The previous entry, fingerprint included, is removed before the model is moved in, and the new
+        // fingerprint is written last, so an interrupted update is never considered valid.
+        let fileManager = FileManager.default
+        try? fileManager.removeItem(at: cacheDirectory)
+        try fileManager.createDirectory(at: cacheDirectory, withIntermediateDirectories: true)
+        let temporaryURL = cacheDirectory.appending(component: "\(UUID().uuidString).tmp")
+        try fileManager.moveItem(at: compiledURL, to: temporaryURL)
+        try fileManager.moveItem(at: temporaryURL, to: cachedURL)
+        try sourceFingerprint.write(to: fingerprintURL, atomically: true, encoding: .utf8)
+        return cachedURL
         #endif
     }
 
+    /// Compiled models are cached in a directory derived from the absolute path of the source model.
+    /// Recompiling a model replaces its previous entry; entries for models that no longer exist are not removed.
+    func compiledModelCacheDirectory(for url: URL) -> URL {
+        let caches = FileManager.default.urls(for: .cachesDirectory, in: .userDomainMask).first!
+        let digest = SHA256.hash(data: Data(url.standardizedFileURL.path.utf8))
+        let key = digest.map { String(format: "%02x", $0) }.joined()
+        return caches
+            .appending(component: "huggingface")
+            .appending(component: "compiled")
+            .appending(component: key)
+    }
+
+    /// Metadata fingerprint of the source model: relative path, size and modification date of every file.
+    /// File contents are not hashed. `mlpackage`s are directories, so we need to check the files inside them.
+    func fingerprint(of url: URL) -> String {
+        let keys: Set<URLResourceKey> = [.isRegularFileKey, .fileSizeKey, .contentModificationDateKey]
+        let baseURL = url.resolvingSymlinksInPath()
+        var files = [baseURL]
+        if let enumerator = FileManager.default.enumerator(at: baseURL, includingPropertiesForKeys: Array(keys)) {
+            files += enumerator.compactMap { $0 as? URL }
+        }
+        return files.compactMap { fileURL -> String? in
+            guard let values = try? fileURL.resourceValues(forKeys: keys), values.isRegularFile == true else { return nil }
+            let relativePath = String(fileURL.resolvingSymlinksInPath().path.dropFirst(baseURL.path.count))
+            let modificationDate = values.contentModificationDate?.timeIntervalSince1970 ?? 0
+            return "\(relativePath)\t\(values.fileSize ?? 0)\t\(modificationDate)"
+        }
+        .sorted()
+        .joined(separator: "\n")
+    }
+
     func run() throws {
         let url = URL(filePath: modelPath)
         let compiledURL = try compile(at: url)
@@ -0,0 +1,112 @@
+//
+//  LanguageModelTests.swift
+//
+
+import XCTest
+import CoreML
+@testable import Models
+
+final class LanguageModelTests: XCTestCase {
+    private let enumeratedShapes = LanguageModel.sortedInputShapes([[1, 128], [1, 32], [1, 64]])
+    private let sequenceLength = 4
+    private let vocabSize = 7
+
+    func testSortedInputShapes() {
+        XCTAssertEqual(enumeratedShapes, [[1, 32], [1, 64], [1, 128]])
+    }
+
+    func testEnumeratedInputShape() {
+        func shape(for tokenCount: Int) -> [Int] {
+            LanguageModel.inputShape(for: tokenCount, constraintType: .enumerated, enumeratedShapes: enumeratedShapes, defaultShape: [1, 128], minContextLength: 32)
+        }
+        // Exact fit
+        XCTAssertEqual(shape(for: 64), [1, 64])
+        // Between two sizes
+        XCTAssertEqual(shape(for: 33), [1, 64])
+        XCTAssertEqual(shape(for: 1), [1, 32])
+        // Largest size
+        XCTAssertEqual(shape(for: 128), [1, 128])
+    }
+
+    func testRangeInputShape() {
+        func shape(for tokenCount: Int) -> [Int] {
+            LanguageModel.inputShape(for: tokenCount, constraintType: .range, enumeratedShapes: [], defaultShape: [1, 1], minContextLength: 8)
+        }
+        // Below the minimum, padded
+        XCTAssertEqual(shape(for: 3), [1, 8])
+        XCTAssertEqual(shape(for: 20), [1, 20])
+    }
+
+    func testFixedInputShape() {
+        let shape = LanguageModel.inputShape(for: 10, constraintType: .unspecified, enumeratedShapes: [], defaultShape: [1, 128], minContextLength: 128)
+        XCTAssertEqual(shape, [1, 128])
+    }
+
+    func testTokenScoresFloat32() throws {
+        let logits = try makeLogits(dataType: .float32)
+        assertLastRowMatches(logits)
+    }
+
+    func testTokenScoresFloat16() throws {
+        let logits = try makeLogits(dataType: .float16)
+        assertLastRowMatches(logits)
+    }
+
+    func testTokenScoresStridedFloat32() throws {
+        // Leave a gap between consecutive elements of the vocabulary dimension
+        let logits = try makeStridedLogits(dataType: .float32, rowStride: vocabSize * 2, elementStride: 2)
+        assertLastRowMatches(logits)
+    }
+
+    func testTokenScoresPaddedRowsFloat16() throws {
+        // Rows padded beyond the vocabulary size, as GPU and Neural Engine outputs often are
+        let logits = try makeStridedLogits(dataType: .float16, rowStride: vocabSize + 5, elementStride: 1)
+        assertLastRowMatches(logits)
+    }
+
+    func testTokenScoresStridedFloat16() throws {
+        // Not contiguous along the vocabulary dimension, so the generic conversion path is used
+        let logits = try makeStridedLogits(dataType: .float16, rowStride: vocabSize * 2, elementStride: 2)
+        assertLastRowMatches(logits)
+    }
+
+    private func makeLogits(dataType: MLMultiArrayDataType) throws -> MLMultiArray {
+        let logits = try MLMultiArray(shape: [1, sequenceLength, vocabSize] as [NSNumber], dataType: dataType)
+        fill(logits)
+        return logits
+    }
+
+    /// Padding between elements is filled with NaNs, so reading it shows up as a mismatch
+    private func makeStridedLogits(dataType: MLMultiArrayDataType, rowStride: Int, elementStride: Int) throws -> MLMultiArray {
+        let count = sequenceLength * rowStride
+        let byteCount = count * (dataType == .float16 ? MemoryLayout<UInt16>.stride : MemoryLayout<Float>.stride)
+        let pointer = UnsafeMutableRawPointer.allocate(byteCount: byteCount, alignment: MemoryLayout<Float>.alignment)
+        pointer.initializeMemory(as: UInt8.self, repeating: 0xFF, count: byteCount)
+        let logits = try MLMultiArray(
+            dataPointer: pointer,
+            shape: [1, sequenceLength, vocabSize] as [NSNumber],
+            dataType: dataType,
+            strides: [count, rowStride, elementStride] as [NSNumber],
+            deallocator: { $0.deallocate() }
+        )
+        fill(logits)
+        return logits
+    }
+
+    /// Values are exactly representable in Float16
+    private func fill(_ logits: MLMultiArray) {
+        for position in 0..<sequenceLength {
+            for token in 0..<vocabSize {
+                logits[[0, position, token] as [NSNumber]] = NSNumber(value: Float(position * vocabSize + token) * 0.5)
+            }
+        }
+    }
+
+    private func assertLastRowMatches(_ logits: MLMultiArray, file: StaticString = #filePath, line: UInt = #line) {
+        let position = sequenceLength - 1
+        let scores = LanguageModel.tokenScores(MLFeatureValue(multiArray: logits), at: position)
+        let expected = MLFeatureValue(multiArray: logits).shapedArrayValue(of: Float.self)![0, position]
+        XCTAssertEqual(scores.shape, [vocabSize], file: file, line: line)
+        XCTAssertEqual(scores.scalars as? [Float], expected.scalars, file: file, line: line)
+    }
+}
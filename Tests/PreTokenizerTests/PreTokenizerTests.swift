@@ -91,6 +91,15 @@ class PreTokenizerTests: XCTestCase {
         )
     }
 
+    func testRangesOfCompiledRegex() {
+        let text = "Hey, friend!  It's 2024...\tcount: 1 2 3?!  \n end"
+        let regex = ByteLevelPreTokenizer.RE
+        XCTAssertEqual(text.ranges(of: regex), text.ranges(of: regex.pattern))
+
+        let digits = try! NSRegularExpression(pattern: #"[^\d]+|\d+"#, options: [])
+        XCTAssertEqual(text.ranges(of: digits), text.ranges(of: digits.pattern))
+    }
+
     func testDigitsPreTokenizer() {
         let preTokenizer1 = DigitsPreTokenizer(config: Config([:]))
 
@@ -43,6 +43,12 @@ final class TensorUtilsTests: XCTestCase {
         XCTAssertEqual(result6.1, 4.0)
     }
 
+    func testFloats() {
+        let shapedArray = MLShapedArray(scalars: [3.0, 4.0, 1.0, 2.0, 5.0, 6.0] as [Float], shape: [2, 3])
+        XCTAssertEqual(shapedArray[1].floats, [2.0, 5.0, 6.0])
+        XCTAssertEqual(MLShapedArray(scalars: [3.0, 4.0, 1.0] as [Float], shape: [3]).floats, [3.0, 4.0, 1.0])
+    }
+
     func testSoftmax() {
         XCTAssertEqual(Math.softmax([]),  [])
         